@@ -1,22 +1,50 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
 import numpy as np
+import math
 from attribute_analyzer import (
     find_similar_attributes,
-    find_differences,
+    add_differences,
     export_to_excel
 )
-import os
 from datetime import datetime
 
 st.set_page_config(page_title="Attribute Similarity Analyzer", layout="wide")
 
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_upload(file_id, _uploaded_file):
+    """Parse the uploaded workbook once per upload, straight from its buffer"""
+    _uploaded_file.seek(0)
+    return pd.read_excel(_uploaded_file, engine='calamine')
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def analyze_attributes(attributes, similarity_threshold):
+    """Run the similarity analysis once per attribute list and threshold"""
+    similar_groups = add_differences(find_similar_attributes(
+        attributes,
+        similarity_threshold=similarity_threshold
+    ))
+    
+    # Convert results to a more streamlit-friendly format
+    results_df = pd.DataFrame.from_records(
+        [
+            (base_attr, match, score, diff_text)
+            for base_attr, matches in similar_groups.items()
+            for match, score, _, diff_text in matches
+        ],
+        columns=["Base Attribute", "Similar Attribute", "Similarity %", "Differences"]
+    )
+    
+    return similar_groups, results_df
+
 # Initialize session state
 if 'similarity_threshold' not in st.session_state:
     st.session_state.similarity_threshold = 90
 if 'analysis_results' not in st.session_state:
     st.session_state.analysis_results = None
+if 'results_table' not in st.session_state:
+    st.session_state.results_table = None
 if 'original_file' not in st.session_state:
     st.session_state.original_file = None
 
@@ -27,13 +55,10 @@ st.write("Upload an Excel file to analyze similar attributes and standardize the
 uploaded_file = st.file_uploader("Choose an Excel file", type=['xlsx', 'xls'])
 
 if uploaded_file is not None:
-    # Save the file temporarily
-    with open("temp_upload.xlsx", "wb") as f:
-        f.write(uploaded_file.getvalue())
-    st.session_state.original_file = "temp_upload.xlsx"
+    st.session_state.original_file = uploaded_file.name
     
     # Load the data
-    df = pd.read_excel(uploaded_file)
+    df = load_upload(uploaded_file.file_id, uploaded_file)
     
     # Dataset Overview
     with st.expander("Dataset Overview", expanded=True):
@@ -57,12 +82,13 @@ if uploaded_file is not None:
         
         if st.button("Run Analysis", type="primary"):
             with st.spinner("Analyzing attributes..."):
-                # Run the analysis
-                similar_groups = find_similar_attributes(
-                    st.session_state.original_file,
-                    similarity_threshold=st.session_state.similarity_threshold
+                # Run the analysis (cached per attribute list and threshold)
+                similar_groups, results_table = analyze_attributes(
+                    df.iloc[:, 0].dropna().unique().tolist(),
+                    st.session_state.similarity_threshold
                 )
                 st.session_state.analysis_results = similar_groups
+                st.session_state.results_table = results_table
                 
                 # Generate Excel report
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -84,22 +110,9 @@ if uploaded_file is not None:
     # Results Display
     if st.session_state.analysis_results:
         with st.expander("Analysis Results", expanded=True):
-            # Convert results to a more streamlit-friendly format
-            results_data = []
-            for base_attr, matches in st.session_state.analysis_results.items():
-                for match, score in matches:
-                    diffs = find_differences(base_attr, match)
-                    diff_text = " vs ".join([f"{d1} → {d2}" for d1, d2 in diffs if d1 or d2])
-                    results_data.append({
-                        "Base Attribute": base_attr,
-                        "Similar Attribute": match,
-                        "Similarity %": score,
-                        "Differences": diff_text
-                    })
+            results_df = st.session_state.results_table
             
-            if results_data:
-                results_df = pd.DataFrame(results_data)
-                
+            if not results_df.empty:
                 # Display results in an interactive table
                 st.dataframe(
                     results_df,
@@ -124,11 +137,24 @@ if uploaded_file is not None:
                 similarities = pd.Series(results_df["Similarity %"])
                 
                 if not similarities.empty:
-                    fig = px.histogram(
-                        x=similarities,
-                        nbins=20,
-                        labels={'x': 'Similarity %', 'y': 'Count'},
-                        title='Distribution of Similarity Scores'
+                    # Bin in NumPy so only the bar heights are sent to the browser.
+                    # Scores are integers, so use up to ~20 equal bins with
+                    # half-integer edges, laid out so the top score (usually
+                    # 100%) always has a bar of its own
+                    lowest, highest = int(similarities.min()), int(similarities.max())
+                    bin_size = max(1, math.ceil((highest - lowest + 1) / 20))
+                    bin_count = math.ceil((highest - lowest) / bin_size) + 1
+                    edges = highest - 0.5 - bin_size * np.arange(bin_count - 1, -2, -1)
+                    counts, edges = np.histogram(similarities, bins=edges)
+                    fig = go.Figure(go.Bar(
+                        x=(edges[:-1] + edges[1:]) / 2,
+                        y=counts,
+                        width=np.diff(edges)
+                    ))
+                    fig.update_layout(
+                        title='Distribution of Similarity Scores',
+                        xaxis_title='Similarity %',
+                        yaxis_title='Count'
                     )
                     st.plotly_chart(fig, use_container_width=True)
                     
@@ -146,7 +172,3 @@ if uploaded_file is not None:
                     st.info("No similar attributes found with the current threshold.")
             else:
                 st.info("No similar attributes found with the current threshold.")
-
-# Cleanup temporary files
-if os.path.exists("temp_upload.xlsx"):
-    os.remove("temp_upload.xlsx")
@@ -1,81 +1,153 @@
 import pandas as pd
 import numpy as np
-from thefuzz import fuzz
+from rapidfuzz import fuzz, process
+from rapidfuzz.distance import Indel
 import re
 from collections import defaultdict
-from openpyxl import Workbook
-from openpyxl.worksheet.worksheet import Worksheet
-from openpyxl.styles import PatternFill, Font, Alignment
-from openpyxl.comments import Comment
+from itertools import combinations
+import xlsxwriter
 import os
-import difflib
-from typing import Dict, List, Tuple, cast
+from typing import Dict, List, Sequence, Tuple, Union
+
+# Patterns used by normalize_text, compiled once at import time
+_RE_DOT = re.compile(r'(?<![\d])\.(?![\d])')
+_RE_OPEN_PAREN = re.compile(r'\s*\(\s*')
+_RE_CLOSE_PAREN = re.compile(r'\s*\)\s*')
+_RE_PUNCTUATION = re.compile(r'[^\w\s]')
+
+# Number of length-sorted attributes scored per cdist call; bounds the score
+# matrix held in memory to _BLOCK_SIZE x N instead of N x N
+_BLOCK_SIZE = 256
 
 def normalize_text(text):
     """Enhanced text normalization"""
     if not isinstance(text, str):
         return str(text)
-    # Convert to lowercase and remove extra whitespace
-    text = text.lower().strip()
+    # Convert to lowercase; each regex pass below only runs when its
+    # character is present
+    text = text.lower()
     # Remove periods that aren't between numbers (preserve decimals)
-    text = re.sub(r'(?<![\d])\.(?![\d])', '', text)
+    if '.' in text:
+        text = _RE_DOT.sub('', text)
     # Standardize spaces around parentheses
-    text = re.sub(r'\s*\(\s*', ' (', text)
-    text = re.sub(r'\s*\)\s*', ') ', text)
+    if '(' in text:
+        text = _RE_OPEN_PAREN.sub(' (', text)
+    if ')' in text:
+        text = _RE_CLOSE_PAREN.sub(') ', text)
     # Remove extra spaces
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
+    return ' '.join(text.split())
+
+def case_variant_key(text):
+    """Canonical form shared by attributes that differ only in case or punctuation"""
+    return _RE_PUNCTUATION.sub('', str(text)).lower()
 
 def are_case_variants(attr1, attr2):
     """Check if two attributes are identical except for case"""
-    # Remove all whitespace and punctuation for comparison
-    clean1 = re.sub(r'[^\w\s]', '', attr1).lower()
-    clean2 = re.sub(r'[^\w\s]', '', attr2).lower()
-    return clean1 == clean2 and attr1 != attr2
+    return case_variant_key(attr1) == case_variant_key(attr2) and attr1 != attr2
+
+def _score_pairs(normalized, similarity_threshold, workers=-1):
+    """
+    Score every pair of normalized attributes that can reach the threshold.
+    
+    fuzz.ratio can never exceed 200 * shorter / (shorter + longer), so the
+    attributes are sorted by length and each one is only compared against the
+    longer attributes inside that bound. Each block is scored by rapidfuzz
+    across `workers` threads (-1 uses every CPU core).
+    
+    No further prefilter is applied: with score_cutoff set rapidfuzz already
+    gives up early on pairs that cannot match, and a character-count bound
+    computed in NumPy costs several times more than the exact scores.
+    
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Index arrays i < j and their
+            scores, sorted by (i, j)
+    """
+    lengths = np.array([len(text) for text in normalized])
+    order = np.argsort(lengths, kind='stable')
+    sorted_lengths = lengths[order]
+    sorted_text = [normalized[k] for k in order]
+    
+    # Scores are rounded before the threshold check, so allow half a point
+    cutoff = max(similarity_threshold - 0.5, 0)
+    if cutoff > 0:
+        max_lengths = sorted_lengths * (200 / cutoff - 1)
+    else:
+        max_lengths = np.full(len(order), np.inf)
+    window_end = np.searchsorted(sorted_lengths, max_lengths, side='right')
+    
+    pair_i, pair_j, pair_scores = [], [], []
+    for start in range(0, len(order), _BLOCK_SIZE):
+        stop = min(start + _BLOCK_SIZE, len(order))
+        # Windows only grow with length, so the last row has the widest one
+        end = window_end[stop - 1]
+        scores = process.cdist(
+            sorted_text[start:stop],
+            sorted_text[start:end],
+            scorer=fuzz.ratio,
+            score_cutoff=cutoff,
+            workers=workers,
+            dtype=np.float64
+        )
+        # Round half to even like Python's round(), as thefuzz did
+        scores = np.rint(scores)
+        rows, cols = np.nonzero(scores >= similarity_threshold)
+        upper = cols > rows
+        rows, cols = rows[upper], cols[upper]
+        
+        # Map block positions back to the original attribute indices
+        i, j = order[start + rows], order[start + cols]
+        pair_i.append(np.minimum(i, j))
+        pair_j.append(np.maximum(i, j))
+        pair_scores.append(scores[rows, cols].astype(np.int64))
+    
+    if not pair_i:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    
+    pair_i, pair_j, pair_scores = (np.concatenate(a) for a in (pair_i, pair_j, pair_scores))
+    index_order = np.lexsort((pair_j, pair_i))
+    return pair_i[index_order], pair_j[index_order], pair_scores[index_order]
 
-def find_similar_attributes(file_path: str, similarity_threshold: float = 80) -> Dict[str, List[Tuple[str, float]]]:
+def find_similar_attributes(attributes: Union[pd.DataFrame, Sequence[str]], similarity_threshold: float = 80, workers: int = -1) -> Dict[str, List[Tuple[str, float]]]:
     """
-    Find similar attributes in an Excel file using fuzzy string matching.
+    Find similar attributes using fuzzy string matching.
     
     Args:
-        file_path (str): Path to the Excel file containing attributes
+        attributes (DataFrame or sequence of str): Attribute names, or a sheet
+            whose first column holds them
         similarity_threshold (float): Minimum similarity threshold (0-100)
+        workers (int): Number of threads used for scoring (-1 uses all CPU cores)
         
     Returns:
         Dict[str, List[Tuple[str, float]]]: Dictionary mapping base attributes to lists of 
             tuples containing (similar_attribute, similarity_score)
     """
-    # Read the Excel file
-    df = pd.read_excel(file_path)
-    
     # Get the column containing attributes (assuming it's the first column)
-    attributes = df.iloc[:, 0].dropna().unique()
+    if isinstance(attributes, pd.DataFrame):
+        attributes = attributes.iloc[:, 0]
+    attributes = pd.Series(attributes).dropna().unique()
     
     # Dictionary to store groups of similar attributes
     similar_groups = defaultdict(list)
     
-    # Compare each pair of attributes
-    for i, attr1 in enumerate(attributes):
-        base_normalized = normalize_text(attr1)
-        
-        for attr2 in attributes[i+1:]:
-            # Skip if they're exactly the same
-            if attr1 == attr2:
-                continue
-                
-            # Check for case variations first
-            if are_case_variants(attr1, attr2):
-                similar_groups[attr1].append((attr2, 100))
-                continue
-            
-            compare_normalized = normalize_text(attr2)
-            
-            # Calculate similarity ratio
-            similarity = fuzz.ratio(base_normalized, compare_normalized)
-            
-            # If similar enough but not identical
-            if similarity >= similarity_threshold:
-                similar_groups[attr1].append((attr2, similarity))
+    # Case variations always count as a full match, so group them by key
+    case_groups = defaultdict(list)
+    for i, attr in enumerate(attributes):
+        case_groups[case_variant_key(attr)].append(i)
+    pair_scores = {
+        pair: 100
+        for group in case_groups.values()
+        for pair in combinations(group, 2)
+    }
+    
+    # Normalize every attribute once and score only the pairs that can match
+    normalized = [normalize_text(attr) for attr in attributes]
+    pair_i, pair_j, scores = _score_pairs(normalized, similarity_threshold, workers)
+    for i, j, score in zip(pair_i.tolist(), pair_j.tolist(), scores.tolist()):
+        pair_scores.setdefault((i, j), score)
+    
+    for (i, j), score in sorted(pair_scores.items()):
+        similar_groups[attributes[i]].append((attributes[j], score))
 
     return similar_groups
 
@@ -116,26 +188,81 @@ def print_similar_groups(similar_groups, min_threshold):
 
 def find_differences(str1, str2):
     """Find the differences between two strings and return the parts that differ"""
-    matcher = difflib.SequenceMatcher(None, str1, str2)
-    differences = []
+    gaps = []
+    
+    # Collect the gaps between matching blocks of the edit script
+    diff_start = None
+    for op in Indel.opcodes(str1, str2):
+        if op.tag != 'equal':
+            if diff_start is None:
+                diff_start = (op.src_start, op.dest_start)
+            continue
+        if diff_start is not None:
+            gaps.append([diff_start[0], op.src_start, diff_start[1], op.dest_start])
+            diff_start = None
+    
+    if diff_start is not None:
+        gaps.append([diff_start[0], len(str1), diff_start[1], len(str2)])
+    
+    # A pure insertion or deletion can often slide along repeated text
+    # ('e Siz' vs 'Size '). Place it like difflib did: at whichever end keeps
+    # the longest block of matching text around it intact
+    for k, gap in enumerate(gaps):
+        i1, i2, j1, j2 = gap
+        if i1 != i2 and j1 != j2:
+            continue
+        text, start, end = (str1, i1, i2) if i1 != i2 else (str2, j1, j2)
+        left_run = i1 - (gaps[k - 1][1] if k else 0)
+        right_run = (gaps[k + 1][0] if k + 1 < len(gaps) else len(str1)) - i2
+        
+        left = 0
+        while left < left_run and text[start - left - 1] == text[end - left - 1]:
+            left += 1
+        right = 0
+        while right < right_run and text[start + right] == text[end + right]:
+            right += 1
+        
+        if max(left_run - left, right_run + left) > max(left_run + right, right_run - right):
+            shift = -left
+        else:
+            shift = right
+        gap[:] = [i1 + shift, i2 + shift, j1 + shift, j2 + shift]
     
-    # Get matching blocks
-    blocks = matcher.get_matching_blocks()
-    
-    # Find the differences between matching blocks
-    last_end1, last_end2 = 0, 0
-    for block in blocks:
-        i, j, size = block
-        if i > last_end1 or j > last_end2:
-            differences.append((
-                str1[last_end1:i],
-                str2[last_end2:j]
-            ))
-        last_end1 = i + size
-        last_end2 = j + size
+    # Gaps that now touch are one difference
+    differences = []
+    last_end = None
+    for i1, i2, j1, j2 in gaps:
+        if i1 == last_end:
+            previous1, previous2 = differences.pop()
+            differences.append((previous1 + str1[i1:i2], previous2 + str2[j1:j2]))
+        else:
+            differences.append((str1[i1:i2], str2[j1:j2]))
+        last_end = i2
     
     return differences
 
+def format_differences(differences):
+    """Render the output of find_differences as 'a → b vs c → d' text"""
+    return " vs ".join([f"{d1} → {d2}" for d1, d2 in differences if d1 or d2])
+
+def add_differences(similar_groups):
+    """
+    Attach the differences of every pair so they are only computed once.
+    
+    Args:
+        similar_groups (dict): Output of find_similar_attributes
+        
+    Returns:
+        dict: Base attributes mapped to (match, score, differences, diff_text) tuples
+    """
+    detailed_groups = {}
+    for base_attr, matches in similar_groups.items():
+        detailed_groups[base_attr] = []
+        for match, score in matches:
+            diffs = find_differences(base_attr, match)
+            detailed_groups[base_attr].append((match, score, diffs, format_differences(diffs)))
+    return detailed_groups
+
 def get_unique_filename(file_path):
     """Generate a unique filename by appending _1, _2, etc. if the file already exists"""
     if not os.path.exists(file_path):
@@ -158,7 +285,8 @@ def export_to_excel(similar_groups, min_threshold, input_file_path):
     Export similar attributes to an Excel file with formatting.
     
     Args:
-        similar_groups (dict): Dictionary of similar attribute groups
+        similar_groups (dict): Dictionary of similar attribute groups, either as
+            returned by find_similar_attributes or by add_differences
         min_threshold (float): Minimum similarity threshold used
         input_file_path (str): Path to the input file
         
@@ -170,116 +298,91 @@ def export_to_excel(similar_groups, min_threshold, input_file_path):
     output_file = f"similarity_{base_name}_{min_threshold}%.xlsx"
     output_file = get_unique_filename(output_file)
 
-    # Create workbook and select active sheet
-    wb: Workbook = Workbook()
-    ws = cast(Worksheet, wb.active)  # Properly cast the active worksheet
-    ws.title = f"Similarity {min_threshold}%+"
-    
-    # Define styles
-    white_fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-    gray_fill = PatternFill(start_color="F5F5F5", end_color="F5F5F5", fill_type="solid")
-    yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-    red_font = Font(color="FF0000")
-    normal_font = Font(color="000000")
-    bold_font = Font(bold=True)
+    # Create workbook; rows are streamed to disk as they are written
+    wb = xlsxwriter.Workbook(output_file, {'constant_memory': True})
+    ws = wb.add_worksheet(f"Similarity {min_threshold}%+")
+    
+    # Define formats once and share them across all cells
+    bold_format = wb.add_format({'bold': True})
+    action_header_format = wb.add_format({'bold': True, 'bg_color': '#FFFF00'})
+    
+    percent_format = wb.add_format({'num_format': '0%'})
+    white_format = wb.add_format({'bg_color': '#FFFFFF'})
+    gray_format = wb.add_format({'bg_color': '#F5F5F5'})
     
     # Add headers
     base_headers = ["Pair ID", "Attribute", "Similarity %", "Differences"]
     action_headers = ["Proposed Catsy Key", "Merge or Keep Separate?", "Pair ID to merge with", "NOTES"]
     all_headers = base_headers + action_headers
     
-    for col, header in enumerate(all_headers, 1):
-        cell = ws.cell(row=1, column=col)
-        cell.value = header
-        cell.font = bold_font
-        
+    for col, header in enumerate(all_headers):
         # Apply yellow highlighting to action columns
         if header in action_headers:
-            cell.fill = yellow_fill
+            ws.write(0, col, header, action_header_format)
+        else:
+            ws.write(0, col, header, bold_format)
             
         # Add notes to specific columns
         if header == "Proposed Catsy Key":
-            comment = Comment("Alex Kamysz: (all lowercase, no spaces, only special characters allowed are underscores _ )", "Attribute Analyzer")
-            cell.comment = comment
+            ws.write_comment(0, col, "Alex Kamysz: (all lowercase, no spaces, only special characters allowed are underscores _ )", {'author': "Attribute Analyzer"})
         elif header == "Pair ID to merge with":
-            comment = Comment("please specify if there are multiple pair IDs to merge", "Attribute Analyzer")
-            cell.comment = comment
+            ws.write_comment(0, col, "please specify if there are multiple pair IDs to merge", {'author': "Attribute Analyzer"})
     
     # Collect and sort all pairs
     all_pairs = []
     for base_attr, matches in similar_groups.items():
-        for match, score in matches:
-            all_pairs.append((base_attr, match, score))
+        for match, score, *precomputed in matches:
+            all_pairs.append((base_attr, match, score, precomputed))
     
     # Sort by similarity percentage (descending)
     all_pairs.sort(key=lambda x: (-x[2], x[0]))
     
-    # Write data
-    current_row = 2
-    pair_id = 1
+    # Similarity cells pick up the column format, so rows need no per-cell
+    # formats (must be set before streaming rows)
+    ws.set_column(2, 2, None, percent_format)
     
-    for base_attr, match, score in all_pairs:
-        # Find differences between the pair
-        diffs = find_differences(base_attr, match)
-        diff_text = " vs ".join([f"{d1} → {d2}" for d1, d2 in diffs if d1 or d2])
-        
-        # Write first attribute of pair
-        fill = white_fill if pair_id % 2 == 0 else gray_fill
+    # Write data, tracking the widest value per column as we go
+    current_row = 1
+    column_widths = [len(header) for header in all_headers]
+    
+    for pair_id, (base_attr, match, score, precomputed) in enumerate(all_pairs, 1):
+        # Find differences between the pair unless they were passed in
+        if precomputed:
+            diffs, diff_text = precomputed
+        else:
+            diffs = find_differences(base_attr, match)
+            diff_text = format_differences(diffs)
         
-        def write_attribute_with_highlighting(row, text, differences):
-            cell = ws.cell(row=row, column=2, value=text)
-            cell.fill = fill
-            cell.font = normal_font
+        # One row per attribute of the pair, action columns left blank
+        for side, attribute in enumerate((base_attr, match)):
+            values = (pair_id, attribute, score / 100, diff_text)
+            ws.write_row(current_row, 0, values)
             
-            if differences:
-                comment = Comment(f"Different parts:\n{', '.join([d[0] if row == current_row else d[1] for d in differences])}", "Attribute Analyzer")
-                cell.comment = comment
-        
-        # First row of pair
-        ws.cell(row=current_row, column=1, value=pair_id).fill = fill
-        write_attribute_with_highlighting(current_row, base_attr, diffs)
-        similarity_cell = ws.cell(row=current_row, column=3, value=score/100)
-        similarity_cell.fill = fill
-        similarity_cell.number_format = '0%'
-        ws.cell(row=current_row, column=4, value=diff_text).fill = fill
-        
-        # Add empty cells with fill color for action columns
-        for col in range(5, len(all_headers) + 1):
-            ws.cell(row=current_row, column=col).fill = fill
-        
-        # Second row of pair
-        ws.cell(row=current_row + 1, column=1, value=pair_id).fill = fill
-        write_attribute_with_highlighting(current_row + 1, match, diffs)
-        similarity_cell = ws.cell(row=current_row + 1, column=3, value=score/100)
-        similarity_cell.fill = fill
-        similarity_cell.number_format = '0%'
-        ws.cell(row=current_row + 1, column=4, value=diff_text).fill = fill
-        
-        # Add empty cells with fill color for action columns
-        for col in range(5, len(all_headers) + 1):
-            ws.cell(row=current_row + 1, column=col).fill = fill
-        
-        current_row += 2
-        pair_id += 1
+            if diffs:
+                ws.write_comment(current_row, 1, f"Different parts:\n{', '.join([d[side] for d in diffs])}", {'author': "Attribute Analyzer"})
+            
+            for col, value in enumerate(values):
+                column_widths[col] = max(column_widths[col], len(str(value)))
+            current_row += 1
+    
+    # Alternate the fill per pair with one conditional format over all rows
+    if current_row > 1:
+        for criteria, fill_format in (('=ISODD($A2)', gray_format), ('=ISEVEN($A2)', white_format)):
+            ws.conditional_format(1, 0, current_row - 1, len(all_headers) - 1, {
+                'type': 'formula',
+                'criteria': criteria,
+                'format': fill_format
+            })
     
     # Adjust column widths
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
+    for col, width in enumerate(column_widths):
+        ws.set_column(col, col, width + 2, percent_format if col == 2 else None)
     
     # Freeze the top row
-    ws.freeze_panes = 'A2'
+    ws.freeze_panes(1, 0)
     
     # Save workbook
-    wb.save(output_file)
+    wb.close()
     print(f"\nResults exported to: {output_file}")
     return output_file
 
@@ -295,7 +398,8 @@ if __name__ == "__main__":
         except ValueError:
             print("Please enter a valid number")
     
-    similar_groups: Dict[str, List[Tuple[str, float]]] = find_similar_attributes(file_path, similarity_threshold=threshold)
+    df = pd.read_excel(file_path, engine='calamine')
+    similar_groups: Dict[str, List[Tuple[str, float]]] = find_similar_attributes(df, similarity_threshold=threshold)
     print(f"\nShowing matches with {threshold}% or higher similarity:")
     print_similar_groups(similar_groups, threshold)
     
@@ -0,0 +1,47 @@
+import difflib
+
+import pandas as pd
+import pytest
+
+from attribute_analyzer import find_differences, find_similar_attributes
+
+SAMPLE_FILE = "daemar-full-attribute-list-for-analysis.xlsx"
+
+def difflib_differences(str1, str2):
+    """The original difflib-based find_differences, kept as a reference"""
+    matcher = difflib.SequenceMatcher(None, str1, str2)
+    differences = []
+    last_end1, last_end2 = 0, 0
+    for i, j, size in matcher.get_matching_blocks():
+        if i > last_end1 or j > last_end2:
+            differences.append((str1[last_end1:i], str2[last_end2:j]))
+        last_end1 = i + size
+        last_end2 = j + size
+    return differences
+
+@pytest.mark.parametrize("str1, str2, expected", [
+    ('A - To Fit Tube Size O.D (in)', 'A- To Fit Tube O.D (in)', [(' ', ''), ('Size ', '')]),
+    ('A - Tolerance (in)', 'A Tolerance (in)', [(' -', '')]),
+    ('A - To Fit Tube Size O.D (in)', 'Tube Size O.D. (in)', [('A - To Fit ', ''), ('', '.')]),
+    ('abc', 'abc', []),
+    ('', 'x', [('', 'x')]),
+])
+def test_find_differences_places_gaps_like_difflib(str1, str2, expected):
+    assert find_differences(str1, str2) == expected
+    assert difflib_differences(str1, str2) == expected
+
+def test_find_differences_matches_difflib_on_sample_sheet():
+    attributes = pd.read_excel(SAMPLE_FILE, engine='calamine')
+    pairs = [
+        (base_attr, match)
+        for base_attr, matches in find_similar_attributes(attributes, similarity_threshold=80).items()
+        for match, _ in matches
+    ]
+    mismatches = [
+        pair for pair in pairs
+        if find_differences(*pair) != difflib_differences(*pair)
+    ]
+
+    # Only pairs where difflib's greedy matching picks a different alignment
+    # altogether are allowed to differ
+    assert len(mismatches) <= len(pairs) // 100
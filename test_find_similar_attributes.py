@@ -0,0 +1,71 @@
+import random
+
+import pandas as pd
+import pytest
+from rapidfuzz import fuzz
+
+import attribute_analyzer
+from attribute_analyzer import case_variant_key, find_similar_attributes, normalize_text
+
+def reference_groups(attributes, similarity_threshold):
+    """Pairwise reference with thefuzz semantics: round() half to even, case variants at 100"""
+    attributes = list(dict.fromkeys(attributes))
+    groups = {}
+    for i, attr1 in enumerate(attributes):
+        for attr2 in attributes[i + 1:]:
+            if case_variant_key(attr1) == case_variant_key(attr2):
+                score = 100
+            else:
+                score = round(fuzz.ratio(normalize_text(attr1), normalize_text(attr2)))
+                if score < similarity_threshold:
+                    continue
+            groups.setdefault(attr1, []).append((attr2, score))
+    return groups
+
+def test_case_variants_score_100_below_threshold():
+    # 'foo-bar' vs 'foobar' only scores 92 once normalized
+    assert find_similar_attributes(['Foo-Bar', 'foobar'], similarity_threshold=95) == {
+        'Foo-Bar': [('foobar', 100)]
+    }
+
+@pytest.mark.parametrize("attr1, attr2, ratio, rounded", [
+    ('abcdexxx', 'abcdeyyy', 62.5, 62),  # rounds down to even
+    ('abcdefgx', 'abcdefgy', 87.5, 88),  # rounds up to even
+])
+def test_half_point_scores_round_half_to_even(attr1, attr2, ratio, rounded):
+    assert fuzz.ratio(attr1, attr2) == ratio
+    assert find_similar_attributes([attr1, attr2], similarity_threshold=rounded) == {
+        attr1: [(attr2, rounded)]
+    }
+    assert find_similar_attributes([attr1, attr2], similarity_threshold=rounded + 1) == {}
+
+def test_length_window_edge_across_blocks(monkeypatch):
+    monkeypatch.setattr(attribute_analyzer, '_BLOCK_SIZE', 2)
+    # 200 * 10 / (10 + 15) == 80 exactly: the longest partner still allowed at 80%
+    attributes = ['abcdefghijklmno', 'zz', 'abcdefghij', 'yyyyyyy', 'abcdefghijklmnop', 'abcdefghijk']
+    groups = find_similar_attributes(attributes, similarity_threshold=80)
+
+    assert ('abcdefghij', 80) in groups['abcdefghijklmno']
+    assert groups == reference_groups(attributes, 80)
+
+@pytest.mark.parametrize("similarity_threshold", [0, 50, 62.5, 80, 90, 100])
+def test_matches_pairwise_reference_with_small_blocks(monkeypatch, similarity_threshold):
+    monkeypatch.setattr(attribute_analyzer, '_BLOCK_SIZE', 3)
+    rng = random.Random(similarity_threshold)
+    attributes = [
+        ''.join(rng.choice('aAb. ()1') for _ in range(rng.randint(0, 10)))
+        for _ in range(60)
+    ]
+    groups = find_similar_attributes(attributes, similarity_threshold=similarity_threshold)
+    assert groups == reference_groups(attributes, similarity_threshold)
+
+def test_dataframe_and_list_input_agree():
+    df = pd.DataFrame({
+        'Attribute': ['Width (in)', 'width (in)', None, 'Width (mm)', 'Width (in)', 'Height (in)'],
+        'Other': range(6),
+    })
+    expected = find_similar_attributes(['Width (in)', 'width (in)', 'Width (mm)', 'Height (in)'], similarity_threshold=70)
+
+    assert expected
+    assert find_similar_attributes(df, similarity_threshold=70) == expected
+    assert find_similar_attributes(df['Attribute'], similarity_threshold=70) == expected